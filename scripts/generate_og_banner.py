@@ -6,6 +6,11 @@ Card: FI-UI-DESIGN-003 (Metadata enhancement)
 Creates a 1200x630 PNG banner for social media sharing (WhatsApp, Twitter, Facebook, LinkedIn)
 """
 
+import functools
+import hashlib
+import sys
+
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import os
 from pathlib import Path
@@ -23,80 +28,77 @@ WHITE_ALPHA_90 = (255, 255, 255, 230)
 WHITE_ALPHA_70 = (255, 255, 255, 180)
 WHITE_ALPHA_30 = (255, 255, 255, 77)
 
+# Baked gradient+glow composite — only text changes between runs, so the
+# background is checked in as an asset. Pass --regen-background after
+# editing colors/geometry to rebuild it.
+BACKGROUND_ASSET = Path(__file__).parent / "assets" / "og_background.png"
 
-def create_gradient_background(width: int, height: int) -> Image.Image:
-    """Create a diagonal gradient from purple to blue."""
-    base = Image.new('RGB', (width, height), PURPLE_DARK)
-    draw = ImageDraw.Draw(base, 'RGBA')
+# macOS system fonts; _load_font falls back to the default font if missing
+FONT_TITLE_PATH = '/System/Library/Fonts/Supplemental/Arial Black.ttf'
+FONT_BODY_PATH = '/System/Library/Fonts/Helvetica.ttc'
 
-    # Create diagonal gradient effect
-    for y in range(height):
-        for x in range(width):
-            # Calculate gradient factor (0.0 to 1.0)
-            factor = (x + y) / (width + height)
 
-            # Interpolate between PURPLE_DARK and PURPLE_LIGHT
-            r = int(PURPLE_DARK[0] + (PURPLE_LIGHT[0] - PURPLE_DARK[0]) * factor)
-            g = int(PURPLE_DARK[1] + (PURPLE_LIGHT[1] - PURPLE_DARK[1]) * factor)
-            b = int(PURPLE_DARK[2] + (PURPLE_LIGHT[2] - PURPLE_DARK[2]) * factor)
+def create_background(width: int, height: int) -> Image.Image:
+    """Create the diagonal gradient with radial glow overlays in one pass."""
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
 
-            draw.point((x, y), fill=(r, g, b))
+    # Diagonal gradient factor (0.0 to 1.0) for every pixel at once
+    factor = (xx + yy) / (width + height)
 
-    return base
+    # Interpolate between PURPLE_DARK and PURPLE_LIGHT per channel
+    rgb = np.stack([
+        PURPLE_DARK[c] + (PURPLE_LIGHT[c] - PURPLE_DARK[c]) * factor
+        for c in range(3)
+    ], axis=-1)
 
+    # Radial glows: alpha fades linearly from peak at the center to 0 at
+    # max_radius, blended alpha-over directly into the float accumulator
+    glows = [
+        ((int(width * 0.3), int(height * 0.4)), 400, 30, (139, 92, 246)),  # purple
+        ((int(width * 0.7), int(height * 0.6)), 350, 25, (59, 130, 246)),  # blue
+    ]
+    for center, max_radius, peak_alpha, color in glows:
+        d = np.hypot(xx - center[0], yy - center[1])
+        weight = np.clip(peak_alpha / 255.0 * (1 - d / max_radius), 0, None)
+        rgb += (np.float32(color) - rgb) * weight[..., None]
 
-def add_radial_overlays(image: Image.Image) -> Image.Image:
-    """Add radial gradient overlays for depth."""
-    overlay = Image.new('RGBA', (WIDTH, HEIGHT), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(overlay, 'RGBA')
+    arr = np.clip(rgb, 0, 255).astype(np.uint8)
+    return Image.fromarray(arr, 'RGB')
 
-    # First radial glow (top-left area)
-    center1 = (int(WIDTH * 0.3), int(HEIGHT * 0.4))
-    max_radius1 = 400
-    for i in range(max_radius1, 0, -5):
-        alpha = int(30 * (i / max_radius1))  # Fade out as radius increases
-        color = (139, 92, 246, alpha)  # Purple with alpha
-        draw.ellipse([
-            center1[0] - i, center1[1] - i,
-            center1[0] + i, center1[1] + i
-        ], fill=color)
 
-    # Second radial glow (bottom-right area)
-    center2 = (int(WIDTH * 0.7), int(HEIGHT * 0.6))
-    max_radius2 = 350
-    for i in range(max_radius2, 0, -5):
-        alpha = int(25 * (i / max_radius2))
-        color = (59, 130, 246, alpha)  # Blue with alpha
-        draw.ellipse([
-            center2[0] - i, center2[1] - i,
-            center2[0] + i, center2[1] + i
-        ], fill=color)
+def load_background(regen: bool = False) -> Image.Image:
+    """Load the baked background asset, recomputing it when asked or missing."""
+    if not regen and BACKGROUND_ASSET.exists():
+        return Image.open(BACKGROUND_ASSET).convert('RGB')
 
-    # Composite overlay onto base image
-    return Image.alpha_composite(image.convert('RGBA'), overlay)
+    image = create_background(WIDTH, HEIGHT)
+    BACKGROUND_ASSET.parent.mkdir(parents=True, exist_ok=True)
+    image.save(BACKGROUND_ASSET, 'PNG', optimize=True)
+    return image
+
+
+@functools.lru_cache(maxsize=None)
+def _load_font(path: str, size: int) -> ImageFont.ImageFont:
+    """Load a TTF once per (path, size), falling back to the default font."""
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default()
 
 
 def add_text_content(image: Image.Image) -> Image.Image:
     """Add text content: logo, title, tagline, features."""
     draw = ImageDraw.Draw(image, 'RGBA')
 
-    # Try to use system fonts, fallback to default
-    try:
-        # macOS system fonts
-        font_title = ImageFont.truetype('/System/Library/Fonts/Supplemental/Arial Black.ttf', 80)
-        font_tagline = ImageFont.truetype('/System/Library/Fonts/Helvetica.ttc', 38)
-        font_features = ImageFont.truetype('/System/Library/Fonts/Helvetica.ttc', 22)
-        font_logo = ImageFont.truetype('/System/Library/Fonts/Helvetica.ttc', 26)
-    except OSError:
-        # Fallback to default font
-        font_title = ImageFont.load_default()
-        font_tagline = ImageFont.load_default()
-        font_features = ImageFont.load_default()
-        font_logo = ImageFont.load_default()
+    font_title = _load_font(FONT_TITLE_PATH, 80)
+    font_tagline = _load_font(FONT_BODY_PATH, 38)
+    font_features = _load_font(FONT_BODY_PATH, 22)
+    font_logo = _load_font(FONT_BODY_PATH, 26)
 
-    # Logo (top-right)
+    # Logo (top-right, right-aligned from its measured width)
     logo_text = "AURITY"
-    logo_pos = (WIDTH - 180, 60)
+    logo_width = font_logo.getbbox(logo_text)[2]
+    logo_pos = (WIDTH - 80 - logo_width, 60)
     draw.text(logo_pos, logo_text, font=font_logo, fill=WHITE_ALPHA_70)
 
     # Main title
@@ -134,28 +136,52 @@ def add_text_content(image: Image.Image) -> Image.Image:
     return image
 
 
+def build_stamp() -> str:
+    """Hash everything the banner depends on: this script, the baked
+    background, and the font files."""
+    h = hashlib.blake2b(Path(__file__).read_bytes())
+    if BACKGROUND_ASSET.exists():
+        h.update(BACKGROUND_ASSET.read_bytes())
+    for font_path in (FONT_TITLE_PATH, FONT_BODY_PATH):
+        font = Path(font_path)
+        if font.exists():
+            h.update(str(font.stat().st_mtime_ns).encode())
+    return h.hexdigest()
+
+
 def main():
     """Generate the Open Graph banner."""
-    print("🎨 Generating Open Graph banner...")
+    regen = '--regen-background' in sys.argv
+    force = '--force' in sys.argv
 
-    # Create base gradient
-    print("  ├─ Creating gradient background...")
-    image = create_gradient_background(WIDTH, HEIGHT)
+    output_path = Path(__file__).parent.parent / "public" / "og-banner.png"
+    stamp_path = output_path.with_name(output_path.name + '.stamp')
 
-    # Add radial overlays for depth
-    print("  ├─ Adding radial overlays...")
-    image = add_radial_overlays(image)
+    # Skip the whole pipeline when nothing the banner depends on has changed
+    stamp = build_stamp()
+    if (not regen and not force and output_path.exists()
+            and stamp_path.exists() and stamp_path.read_text() == stamp):
+        print(f"✅ Banner up to date: {output_path} (--force to regenerate)")
+        return
+
+    print("🎨 Generating Open Graph banner...")
+
+    # Load (or re-bake) the gradient + radial glow background
+    print(f"  ├─ {'Re-baking' if regen else 'Loading'} gradient background...")
+    image = load_background(regen=regen)
 
     # Add text content
     print("  ├─ Adding text content...")
     image = add_text_content(image)
 
     # Save to public directory
-    output_path = Path(__file__).parent.parent / "public" / "og-banner.png"
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     print(f"  ├─ Saving to {output_path}...")
-    image.convert('RGB').save(output_path, 'PNG', optimize=True, quality=95)
+    image.save(output_path, 'PNG', optimize=True, quality=95)
+
+    # Recompute the stamp — --regen-background may have changed the asset
+    stamp_path.write_text(build_stamp())
 
     file_size = output_path.stat().st_size / 1024  # KB
     print(f"  └─ ✅ Banner created successfully!")